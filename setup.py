@@ -28,7 +28,7 @@ def read_requirements():
                 if line and not line.startswith('#'):
                     requirements.append(line)
             return requirements
-    return ['pretty_midi>=0.2.8', 'numpy>=1.19.0']
+    return ['pretty_midi>=0.2.8', 'numpy>=1.19.0', 'mido>=1.2.0']
 
 
 setup(
@@ -61,11 +61,13 @@ setup(
     python_requires=">=3.7",
     install_requires=read_requirements(),
     extras_require={
+        'fast': ['orjson>=3.0.0'],
+        'stream': ['ijson>=3.0'],
         'web': ['flask>=2.0.0', 'gunicorn>=20.0.0'],
         'dev': ['pytest>=6.0.0', 'pytest-cov>=2.10.0'],
         'all': [
-            'flask>=2.0.0', 'gunicorn>=20.0.0', 'pytest>=6.0.0',
-            'pytest-cov>=2.10.0'
+            'orjson>=3.0.0', 'ijson>=3.0', 'flask>=2.0.0', 'gunicorn>=20.0.0',
+            'pytest>=6.0.0', 'pytest-cov>=2.10.0'
         ]
     },
     entry_points={
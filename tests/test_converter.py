@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tests for the ugly_midi.converter module.
+
+Usage:
+    python -m pytest tests/test_converter.py
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pretty_midi
+
+from ugly_midi import converter
+
+
+def midi_summary(pm):
+    """Instrument names, programs and (pitch, start, end) notes of a PrettyMIDI."""
+    return [(inst.name, inst.program,
+             [(n.pitch, n.start, n.end) for n in inst.notes])
+            for inst in pm.instruments]
+
+
+class TestConverterHelpers(unittest.TestCase):
+    """Tests for the converter's helper functions."""
+
+    def test_note_id_sort_key_orders_counters_numerically(self):
+        """Note IDs with a numeric suffix sort by number, not by string."""
+        notes = [{'id': f'converted-0-{i}'} for i in (10, 2, 1, 11, 9)]
+        ordered = sorted(notes, key=converter.note_id_sort_key)
+        self.assertEqual([n['id'] for n in ordered], [
+            'converted-0-1', 'converted-0-2', 'converted-0-9',
+            'converted-0-10', 'converted-0-11'
+        ])
+
+    def test_note_id_sort_key_without_numeric_suffix(self):
+        """IDs without a counter (or without an ID) still sort as strings."""
+        notes = [{'id': 'note-b'}, {}, {'id': 'note-a'}]
+        ordered = sorted(notes, key=converter.note_id_sort_key)
+        self.assertEqual([n.get('id') for n in ordered],
+                         [None, 'note-a', 'note-b'])
+
+    def test_convert_to_json_bytes_round_trips(self):
+        """Serialized bytes parse back to the same VexFlow JSON."""
+        json_data = {'tempo': 120, 'measures': [[{
+            'id': 'converted-0-1', 'name': '(C4 E4)', 'clef': 'treble',
+            'duration': 'q', 'measure': 0, 'isRest': False
+        }], []]}
+        for indent in (2, None):
+            encoded = converter.convert_to_json_bytes(json_data, indent=indent)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), json_data)
+
+    def test_vexflow_safe_batch_matches_scalar(self):
+        """The vectorized safe-duration lookup agrees with the scalar one."""
+        beats = [i / 32 for i in range(0, 260)] + [0.625, 0.875, 7.0]
+        for max_beats in (4.0, 3.0, 1.5):
+            expected = [converter.beats_to_duration_symbol_vexflow_safe(b, max_beats)
+                        for b in beats]
+            actual = converter.beats_to_duration_symbol_vexflow_safe_batch(beats, max_beats)
+            self.assertEqual(actual.tolist(), expected)
+
+    def test_pianotour_clef_outside_midi_range(self):
+        """Clefs follow the C4 split for negative, >127 and float pitches."""
+        for midi_note, clef in ((-5, 'bass'), (130, 'treble'), (59.5, 'bass'),
+                                (60.0, 'treble')):
+            self.assertEqual(converter.determine_clef_pianotour_safe(midi_note), clef)
+            self.assertEqual(converter.determine_chord_clef_pianotour_safe(
+                [{'midi_note': midi_note}]), clef)
+
+    def test_load_balanced_clef_batch_matches_scalar(self):
+        """The vectorized single-note clef rule agrees with the scalar one."""
+        midi_notes = list(range(50, 71))
+        for treble_load, bass_load in ((0.0, 0.0), (2.5, 1.0), (1.0, 2.5), (2.0, 1.0)):
+            loads = {'treble': treble_load, 'bass': bass_load}
+            expected = [converter.choose_clef_with_load_balancing(n, loads, 4.0)
+                        for n in midi_notes]
+            actual = converter.choose_clef_with_load_balancing_batch(midi_notes, treble_load, bass_load)
+            self.assertEqual(actual.tolist(), expected)
+
+    def test_load_balanced_clefs_accept_numpy_scalars(self):
+        """The clef helpers take NumPy pitches and loads like plain numbers."""
+        loads = {'treble': np.float32(0.0), 'bass': np.float32(0.0)}
+        self.assertEqual(converter.choose_clef_with_load_balancing(np.int64(62), loads, 4.0),
+                         'treble')
+        chord = [{'midi_note': np.int64(50)}, {'midi_note': np.int64(64)}]
+        self.assertEqual(converter.choose_chord_clef_with_load_balancing(chord, loads, 4.0),
+                         'bass')
+        context = {'treble_load': np.float64(1.0), 'bass_load': np.float64(0.0)}
+        self.assertEqual(converter.determine_clef_with_load_balancing(
+            [{'midi_note': 64}], context), 'treble')
+
+    def test_parse_note_name_matches_pretty_midi(self):
+        """Table lookups agree with pretty_midi, which still rejects bad names."""
+        for name in ('C4', 'c#4', 'Bb-1', 'G!9', 'A0'):
+            self.assertEqual(converter.parse_note_name(name),
+                             [pretty_midi.note_name_to_number(name)])
+        self.assertEqual(converter.parse_note_name('(C4 E4 G4)'), [60, 64, 67])
+        with self.assertRaises(ValueError):
+            converter.parse_note_name('H4')
+
+    def test_measure_splitting_on_clef_overflow(self):
+        """Events that overflow their clef start a new measure with fresh ids."""
+        pm = pretty_midi.PrettyMIDI(initial_tempo=120)
+        instrument = pretty_midi.Instrument(program=0)
+
+        def add(pitches, start_beat, beats):
+            # One beat is 0.5 seconds at 120 BPM
+            for pitch in pitches:
+                instrument.notes.append(pretty_midi.Note(
+                    80, pitch, start_beat * 0.5, (start_beat + beats) * 0.5))
+
+        add((53, 69), 0, 1)      # (F3 A4) straddles C4
+        add((48, 64), 0, 2)      # (C3 E4) straddles C4
+        add((50, 55, 67), 0, 3)  # (D3 G3 G4) balanced into the treble
+        add((62,), 1, 2)         # D4 overflows the treble: new measure
+        add((40,), 1, 4)         # E2 fills the bass
+        add((45, 48), 2, 1)      # (A2 C3) overflows the bass: new measure
+        pm.instruments.append(instrument)
+
+        json_data = converter.create_json_from_midi(pm, 0.25, 120)
+        summary = [[(n['id'], n['name'], n['clef'], n['duration'], n['measure'])
+                    for n in measure] for measure in json_data['measures']]
+        self.assertEqual(summary, [
+            [('converted-0-1', '(F3 A4)', 'bass', 'q', 0),
+             ('converted-0-2', '(C3 E4)', 'bass', 'h', 0),
+             ('converted-0-3', '(D3 G3 G4)', 'treble', 'h.', 0)],
+            [('converted-1-1', 'D4', 'treble', 'h', 1),
+             ('converted-1-2', 'E2', 'bass', 'w', 1)],
+            [('converted-2-1', '(A2 C3)', 'bass', 'q', 2)],
+        ])
+
+    def test_half_way_durations_at_non_integral_tempo(self):
+        """5/8 and 7/8-beat notes at 142 BPM get the exact-grid symbols."""
+        beat = 60.0 / 142
+        pm = pretty_midi.PrettyMIDI(initial_tempo=142)
+        instrument = pretty_midi.Instrument(program=0)
+        instrument.notes.append(pretty_midi.Note(80, 72, 0.0, 0.625 * beat))
+        instrument.notes.append(pretty_midi.Note(80, 74, beat, 1.875 * beat))
+        pm.instruments.append(instrument)
+
+        json_data = converter.create_json_from_midi(pm, 0.125, 142)
+        self.assertEqual([(n['name'], n['duration']) for n in json_data['measures'][0]],
+                         [('C5', '8'), ('D5', 'q')])
+
+    def test_notes_on_the_same_grid_ticks_form_one_chord(self):
+        """Notes quantized to the same start and length are one chord."""
+        beat = 60.0 / 142
+        pm = pretty_midi.PrettyMIDI(initial_tempo=142)
+        instrument = pretty_midi.Instrument(program=0)
+        instrument.notes.append(pretty_midi.Note(80, 60, beat + 0.001, 2 * beat - 0.002))
+        instrument.notes.append(pretty_midi.Note(80, 64, beat - 0.002, 2 * beat + 0.001))
+        instrument.notes.append(pretty_midi.Note(80, 67, beat + 0.002, 2 * beat))
+        pm.instruments.append(instrument)
+
+        json_data = converter.create_json_from_midi(pm, 0.125, 142)
+        self.assertEqual([(n['name'], n['duration']) for n in json_data['measures'][0]],
+                         [('(C4 E4 G4)', 'q')])
+
+    def test_json_from_loaded_midi_matches_path(self):
+        """A loaded PrettyMIDI converts the same as its file path."""
+        midi_path = os.path.join(os.path.dirname(__file__), 'test_ensemble.mid')
+        from_path = converter.create_json_from_midi(midi_path)
+        from_loaded = converter.create_json_from_midi(pretty_midi.PrettyMIDI(midi_path))
+        self.assertEqual(from_loaded, from_path)
+
+    def test_parallel_parts_match_sequential(self):
+        """Building parts in worker processes gives the same MIDI data."""
+        def part(instrument, names):
+            return {'instrument': instrument, 'tempo': 120, 'measures': [[
+                {'id': f'n-{i}', 'name': name, 'clef': 'treble', 'duration': 'q'}
+                for i, name in enumerate(names, 1)
+            ]]}
+
+        parts = [part('piano', ['C4', '(E4 G4)']), part('violin', ['A4', 'B4', 'C5'])]
+        sequential = converter.create_midi_from_multiple_json(parts)
+        parallel = converter.create_midi_from_multiple_json(parts, max_workers=2)
+
+        self.assertEqual(midi_summary(parallel), midi_summary(sequential))
+
+    def test_json_stream_matches_loaded_json(self):
+        """Streaming measures from disk gives the same MIDI as loaded JSON."""
+        json_data = {'tempo': 96, 'instrument': 'violin',
+                     'timeSignature': {'numerator': 3, 'denominator': 4},
+                     'measures': [[
+                         {'id': 'n-1', 'name': 'C4', 'clef': 'treble', 'duration': 'q'},
+                         {'id': 'n-2', 'name': '(E4 G4)', 'clef': 'treble', 'duration': 'h'},
+                     ], [
+                         {'id': 'n-3', 'name': 'A3', 'clef': 'bass', 'duration': 'h.'},
+                     ]]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'part.json')
+            with open(path, 'w') as f:
+                json.dump(json_data, f)
+            streamed = converter.create_midi_from_json_stream([path])
+        loaded = converter.create_midi_from_multiple_json([json_data])
+
+        self.assertEqual(midi_summary(streamed), midi_summary(loaded))
+        self.assertEqual(streamed.time_signature_changes[0].numerator, 3)
+
+    def test_json_stream_header_after_measures(self):
+        """Header keys after the measures are found only when still missing."""
+        measures = '[[{"id": "n-1", "name": "C4", "clef": "treble", "duration": "q"}]]'
+        header = ('"keySignature": "C", "timeSignature": {"numerator": 4, "denominator": 4}, '
+                  '"instrument": "piano", "midiChannel": "0"')
+        late_tempo = '{%s, "measures": %s, "tempo": 60}' % (header, measures)
+        complete = '{%s, "tempo": 120, "measures": %s, "tempo": 60}' % (header, measures)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ends = []
+            for name, text in (('late.json', late_tempo), ('complete.json', complete)):
+                path = os.path.join(tmp, name)
+                with open(path, 'w') as f:
+                    f.write(text)
+                pm = converter.create_midi_from_json_stream([path])
+                ends.append(pm.instruments[0].notes[0].end)
+
+        # One quarter note: 1s at 60 BPM; the complete header stops at 120 BPM
+        self.assertEqual(ends, [1.0, 0.5])
+
+    def test_direct_midi_write_matches_pretty_midi(self):
+        """Writing with mido directly gives the same bytes as PrettyMIDI.write."""
+        parts = [{'instrument': 'piano', 'tempo': 100, 'keySignature': 'Eb',
+                  'timeSignature': {'numerator': 3, 'denominator': 4},
+                  'measures': [[
+                      {'id': 'n-1', 'name': '(C3 E4)', 'clef': 'bass', 'duration': 'q'},
+                      {'id': 'n-2', 'name': 'C4', 'clef': 'treble', 'duration': 'h'},
+                  ], [
+                      {'id': 'n-3', 'name': 'C4', 'clef': 'treble', 'duration': 'h.'},
+                  ]]},
+                 {'instrument': 'violin', 'measures': [[
+                      {'id': 'n-1', 'name': 'A4', 'clef': 'treble', 'duration': 'w'},
+                  ]]}]
+        expected = io.BytesIO()
+        converter.create_midi_from_multiple_json(parts).write(expected)
+        actual = io.BytesIO()
+        converter.write_midi_from_multiple_json(parts, actual)
+        self.assertEqual(actual.getvalue(), expected.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,9 @@ DURATION_TO_BEATS = {
     '16.': 0.375,  # dotted sixteenth (0.375 beats)
 }
 
+# (symbol, beats) pairs scanned by beats_to_duration_symbol
+_DURATION_ITEMS = tuple(DURATION_TO_BEATS.items())
+
 
 def parse_note_name(name):
     """
@@ -105,7 +108,10 @@ def process_measures(measures, tempo, time_signature):
     # Convert to quarter note beats (pretty_midi works in quarter note beats)
     measure_duration_beats = beats_per_measure * (4.0 / beat_unit)
 
-    for measure_idx, measure in enumerate(measures):
+    # Start time of the current measure (sum of all previous durations)
+    measure_start = 0.0
+
+    for measure in measures:
         measure_duration_seconds = beats_to_seconds(measure_duration_beats,
                                                     tempo)
         measure_durations.append(measure_duration_seconds)
@@ -127,7 +133,6 @@ def process_measures(measures, tempo, time_signature):
             clef = note_data['clef']
 
             # Calculate absolute start time
-            measure_start = sum(measure_durations[:measure_idx])
             beat_offset = clef_positions[clef]
             start_time = measure_start + beats_to_seconds(beat_offset, tempo)
 
@@ -158,6 +163,8 @@ def process_measures(measures, tempo, time_signature):
             # Advance position for this clef
             clef_positions[clef] += duration_beats
 
+        measure_start += measure_duration_seconds
+
     return notes_by_clef, measure_durations
 
 
@@ -325,7 +332,7 @@ def beats_to_duration_symbol(beats):
     closest_duration = 'q'  # Default to quarter note
     closest_diff = float('inf')
 
-    for symbol, duration_beats in DURATION_TO_BEATS.items():
+    for symbol, duration_beats in _DURATION_ITEMS:
         diff = abs(beats - duration_beats)
         if diff < closest_diff:
             closest_diff = diff
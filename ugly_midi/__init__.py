@@ -74,7 +74,8 @@ def midi_to_json(midi_file_path, quantize_resolution=0.25, manual_tempo=142):
     Convert MIDI file to VexFlow JSON format.
 
     Args:
-        midi_file_path (str): Path to MIDI file
+        midi_file_path (str or pretty_midi.PrettyMIDI): Path to MIDI file, or
+            MIDI data that is already loaded
         quantize_resolution (float): Quantization resolution in beats
         manual_tempo (int): Manual tempo override (use your DAW's tempo for best results)
 
@@ -137,9 +138,8 @@ def load_json_file(json_file_path):
         >>> json_data = ugly_midi.load_json_file('song.json')
         >>> midi = ugly_midi.json_to_midi(json_data)
     """
-    import json
-    with open(json_file_path, 'r') as f:
-        return json.load(f)
+    from .converter import read_json_file
+    return read_json_file(json_file_path)
 
 
 def save_json_file(json_data, output_path):
@@ -154,9 +154,9 @@ def save_json_file(json_data, output_path):
         >>> json_data = ugly_midi.midi_to_json('input.mid')
         >>> ugly_midi.save_json_file(json_data, 'output.json')
     """
-    import json
-    with open(output_path, 'w') as f:
-        json.dump(json_data, f, indent=2)
+    from .converter import convert_to_json_bytes
+    with open(output_path, 'wb') as f:
+        f.write(convert_to_json_bytes(json_data))
 
 
 # Convenience function for the winning combination
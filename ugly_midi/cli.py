@@ -13,7 +13,8 @@ from pathlib import Path
 
 # Import the converter functions
 from .converter import (create_midi_from_multiple_json, create_json_from_midi,
-                        create_json_from_midi_file)
+                        create_json_from_midi_file, read_json_file,
+                        convert_to_json_bytes)
 
 
 def main():
@@ -81,8 +82,8 @@ Examples:
                 print(json.dumps(json_data, indent=2))
             else:
                 # Save to specified file
-                with open(args.to_json, 'w') as f:
-                    json.dump(json_data, f, indent=2)
+                with open(args.to_json, 'wb') as f:
+                    f.write(convert_to_json_bytes(json_data))
                 print(f"Successfully converted MIDI to JSON: '{args.to_json}'")
 
         except Exception as e:
@@ -125,8 +126,7 @@ Examples:
 
         # Load JSON data
         try:
-            with open(input_path, 'r') as f:
-                json_data = json.load(f)
+            json_data = read_json_file(input_path)
             json_data_list.append(json_data)
             if args.verbose:
                 instrument = json_data.get('instrument', 'unknown')
@@ -7,8 +7,42 @@ and MIDI formats, without the command-line interface.
 """
 
 import json
+import logging
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import groupby, repeat
+from operator import itemgetter
+
+import mido
+import numpy as np
 import pretty_midi
 
+# Per-measure progress goes to this logger at DEBUG level
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON parsing
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Optional: streaming JSON parsing
+    ijson = None
+
+# Ticks per beat used for written MIDI files (pretty_midi's default)
+_MIDI_RESOLUTION = 220
+
+# Channels for written instrument tracks, skipping the drum channel (9)
+_MIDI_CHANNELS = tuple(channel for channel in range(16) if channel != 9)
+
+# mido key signature names, indexed by pretty_midi key number
+_MIDO_KEY_NAMES = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B',
+                   'Cm', 'C#m', 'Dm', 'D#m', 'Em', 'Fm', 'F#m', 'Gm', 'G#m', 'Am',
+                   'Bbm', 'Bm')
+
 # Duration mappings from VexFlow notation to beats
 DURATION_TO_BEATS = {
     'w': 4.0,  # whole note
@@ -24,6 +58,134 @@ DURATION_TO_BEATS = {
     '16.': 0.375,  # dotted sixteenth (0.375 beats)
 }
 
+# DURATION_TO_BEATS as (symbol, beats) pairs for closest-duration scans, plus
+# a lookup keyed by the number of 32nd notes (eighths of a beat) for exact
+# durations
+_DURATION_ITEMS = tuple(DURATION_TO_BEATS.items())
+_EIGHTHS_TO_DURATION_SYMBOL = {
+    int(beats * 8): symbol for symbol, beats in DURATION_TO_BEATS.items()
+}
+# The same pairs for the simple (non-dotted) durations only
+_SIMPLE_DURATION_ITEMS = tuple(item for item in _DURATION_ITEMS if '.' not in item[0])
+
+# Durations that are safe to hand to VexFlow, shortest first
+# (NO dotted whole notes - VexFlow hates them)
+_SAFE_DURATION_SYMBOLS = ('32', '16', '16.', '8', '8.', 'q', 'q.', 'h', 'h.', 'w')
+_SAFE_DURATION_BEATS = tuple(DURATION_TO_BEATS[s] for s in _SAFE_DURATION_SYMBOLS)
+_SAFE_BEATS_TO_SYMBOL = dict(zip(_SAFE_DURATION_BEATS, _SAFE_DURATION_SYMBOLS))
+_SAFE_DURATION_SYMBOLS_ARRAY = np.array(_SAFE_DURATION_SYMBOLS)
+_SAFE_DURATION_BEATS_ARRAY = np.array(_SAFE_DURATION_BEATS)
+
+# Time signature assumed when a JSON or MIDI file does not specify one.
+# Shared and read-only: copy it before handing it out.
+DEFAULT_TIME_SIGNATURE = {'numerator': 4, 'denominator': 4}
+
+# Instrument names used in VexFlow JSON mapped to General MIDI program names
+INSTRUMENT_NAME_MAP = {
+    'piano': 'Acoustic Grand Piano',
+    'guitar': 'Acoustic Guitar (nylon)',
+    'cello': 'Cello',
+    'violin': 'Violin',
+    'sax': 'Alto Sax',
+    'saxophone': 'Alto Sax',
+    'drums': 'Acoustic Grand Piano',  # Will be handled specially
+}
+
+# The same instrument names mapped straight to General MIDI program numbers
+INSTRUMENT_PROGRAM = {
+    name: pretty_midi.instrument_name_to_program(program_name)
+    for name, program_name in INSTRUMENT_NAME_MAP.items()
+}
+_DEFAULT_PROGRAM = pretty_midi.instrument_name_to_program('Acoustic Grand Piano')
+
+# General MIDI program names mapped back to our simplified instrument names
+PROGRAM_NAME_TO_INSTRUMENT = {
+    'Acoustic Grand Piano': 'piano',
+    'Acoustic Guitar (nylon)': 'guitar',
+    'Acoustic Guitar (steel)': 'guitar',
+    'Electric Guitar (clean)': 'guitar',
+    'Cello': 'cello',
+    'Violin': 'violin',
+    'Alto Sax': 'sax',
+}
+
+# Row layout of the note table create_json_from_midi builds from a MIDI file
+NOTE_TABLE_DTYPE = np.dtype([
+    ('measure', np.int64),
+    ('start_time', np.float64),  # quantized, in seconds
+    ('start_tick', np.int64),  # quantized start on the quantization grid
+    ('duration_ticks', np.int64),
+    ('duration_beats', np.float64),  # rounded to 0.01 beat
+    ('duration_symbol', np.int8),  # index into _SAFE_DURATION_SYMBOLS
+    ('midi_note', np.int16),
+    ('event', np.int64),  # running id of the note's event (single note or chord)
+])
+
+# A note scheduled for MIDI output by process_measures
+NoteInfo = namedtuple('NoteInfo',
+                      ['start_time', 'end_time', 'midi_note', 'velocity', 'original_data'])
+
+# A single note or chord handed from the measure grouper to the splitter
+NoteEvent = namedtuple('NoteEvent',
+                       ['start_time', 'duration_beats', 'safe_duration', 'safe_beats', 'pitches'])
+
+# Note name for every MIDI pitch, e.g. _PITCH_NAMES[60] == 'C4'
+_PITCH_NAMES = tuple(pretty_midi.note_number_to_name(pitch) for pitch in range(128))
+# The same keyed by number, so any numeric type (or a miss) can be looked up
+_PITCH_NAME_BY_NUMBER = dict(enumerate(_PITCH_NAMES))
+
+# Note name spellings (either letter case, natural/#/b/!, octaves -1 to 9)
+# mapped to MIDI note numbers, as pretty_midi.note_name_to_number would
+NOTE_NAME_TO_MIDI = {
+    f'{letter}{accidental}{octave}': 12 * (octave + 1) + semitone + offset
+    for letter, semitone in (('C', 0), ('D', 2), ('E', 4), ('F', 5), ('G', 7), ('A', 9), ('B', 11))
+    for accidental, offset in (('', 0), ('#', 1), ('b', -1), ('!', -1))
+    for octave in range(-1, 10)
+}
+NOTE_NAME_TO_MIDI.update({name[0].lower() + name[1:]: number
+                          for name, number in NOTE_NAME_TO_MIDI.items()})
+
+# Clef names indexed by a treble flag (0 = bass, 1 = treble)
+_CLEF_NAMES = ('bass', 'treble')
+_BASS, _TREBLE = 0, 1
+
+
+def read_json_file(json_file_path):
+    """
+    Load a JSON file, using orjson when it is installed.
+
+    Args:
+        json_file_path (str): Path to JSON file
+
+    Returns:
+        dict: Parsed JSON data
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    with open(json_file_path, 'rb') as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def convert_to_json_bytes(json_data, indent=2):
+    """
+    Serialize VexFlow JSON to UTF-8 bytes, using orjson when it is installed.
+
+    Args:
+        json_data (dict): VexFlow JSON data
+        indent (int, optional): Pretty-print indentation; orjson always
+            indents by 2. Pass None for compact output.
+
+    Returns:
+        bytes: Encoded JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(json_data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(json_data, indent=indent).encode('utf-8')
+
 
 def parse_note_name(name):
     """
@@ -35,13 +197,39 @@ def parse_note_name(name):
     Returns:
         list: List of MIDI note numbers
     """
+    return list(_parse_note_name(name))
+
+
+@lru_cache(maxsize=4096)
+def _parse_note_name(name):
+    """Cached parse_note_name; returns a tuple so the cached value stays immutable."""
     if name.startswith('(') and name.endswith(')'):
         # Chord notation: "(C4 E4 G4)"
         note_names = name[1:-1].split()
-        return [pretty_midi.note_name_to_number(note) for note in note_names]
     else:
         # Single note: "C4"
-        return [pretty_midi.note_name_to_number(name)]
+        note_names = (name,)
+
+    # Spellings outside the table go through pretty_midi, which also
+    # raises ValueError for malformed names
+    return tuple(NOTE_NAME_TO_MIDI[note] if note in NOTE_NAME_TO_MIDI
+                 else pretty_midi.note_name_to_number(note)
+                 for note in note_names)
+
+
+@lru_cache(maxsize=None)
+def measure_length_beats(numerator, denominator):
+    """
+    Length of one measure in quarter-note beats.
+
+    Args:
+        numerator (int): Time signature numerator
+        denominator (int): Time signature denominator
+
+    Returns:
+        float: Beats per measure, e.g. 4.0 for 4/4 or 3.0 for 6/8
+    """
+    return (numerator * 4.0) / denominator
 
 
 def beats_to_seconds(beats, tempo):
@@ -93,18 +281,12 @@ def calculate_duration_with_quantization(start_time, end_time, tempo, quantize_r
     Returns:
         float: Duration in beats (quantized)
     """
-    # Quantize start and end times
-    quantized_start = quantize_time(start_time, quantize_resolution, tempo)
-    quantized_end = quantize_time(end_time, quantize_resolution, tempo)
-    
-    # Calculate duration in seconds
-    duration_seconds = quantized_end - quantized_start
-    
-    # Convert to beats
-    duration_beats = (duration_seconds * tempo) / 60.0
+    # Quantize start and end directly in beats (no round trip through seconds)
+    quantized_start = round((start_time * tempo) / 60.0 / quantize_resolution) * quantize_resolution
+    quantized_end = round((end_time * tempo) / 60.0 / quantize_resolution) * quantize_resolution
     
     # Ensure minimum duration (don't allow zero or negative durations)
-    return max(duration_beats, quantize_resolution)
+    return max(quantized_end - quantized_start, quantize_resolution)
 
 
 def calculate_note_timing(note_data, measure_start_times, tempo):
@@ -127,6 +309,26 @@ def calculate_note_timing(note_data, measure_start_times, tempo):
     return measure_start
 
 
+def note_id_sort_key(note_data):
+    """
+    Sort key that orders notes by ID, comparing a trailing counter numerically.
+
+    IDs like "converted-5-10" sort after "converted-5-9" rather than
+    before it; IDs without a numeric suffix sort as plain strings.
+
+    Args:
+        note_data (dict): Note information
+
+    Returns:
+        tuple: (id prefix, counter), counter is -1 without a numeric suffix
+    """
+    note_id = str(note_data.get('id', ''))
+    prefix, _, counter = note_id.rpartition('-')
+    if counter.isdecimal():
+        return prefix, int(counter)
+    return note_id, -1
+
+
 def process_measures(measures, tempo, time_signature):
     """
     Process all measures and calculate timing.
@@ -137,11 +339,30 @@ def process_measures(measures, tempo, time_signature):
         time_signature (dict): Time signature with numerator/denominator
 
     Returns:
-        tuple: (notes_by_clef, measure_durations)
+        tuple: (notes_by_clef, measure_durations), where notes_by_clef maps
+            each clef to a list of NoteInfo tuples
+    """
+    columns_by_clef, measure_durations = _process_measure_columns(measures, tempo, time_signature)
+
+    # Default velocity 80
+    notes_by_clef = {
+        clef: list(map(NoteInfo, start_times, end_times, pitches, repeat(80), sources))
+        for clef, (start_times, end_times, pitches, sources) in columns_by_clef.items()
+    }
+
+    return notes_by_clef, measure_durations
+
+
+def _process_measure_columns(measures, tempo, time_signature, keep_sources=True):
     """
-    notes_by_clef = {'treble': [], 'bass': []}
-    measure_durations = []
+    Column form of process_measures. Returns (columns_by_clef,
+    measure_durations), where columns_by_clef maps each clef to parallel
+    lists of (start_times, end_times, midi_notes, source note dicts).
 
+    measures may be any iterable, e.g. a stream of parsed measures. With
+    keep_sources=False the source list stays empty, so parsed measures are
+    not kept alive.
+    """
     # Calculate measure duration based on time signature
     beats_per_measure = time_signature['numerator']
     beat_unit = time_signature['denominator']
@@ -149,35 +370,33 @@ def process_measures(measures, tempo, time_signature):
     # Convert to quarter note beats (pretty_midi works in quarter note beats)
     measure_duration_beats = beats_per_measure * (4.0 / beat_unit)
 
+    measure_duration_seconds = beats_to_seconds(measure_duration_beats, tempo)
+    measure_count = 0
+
+    # Walk the measures once, collecting each clef's notes as parallel
+    # columns: measure index, beat offset within the measure, duration in
+    # beats, MIDI note and the source note dict
+    columns_by_clef = {clef: ([], [], [], [], []) for clef in ('treble', 'bass')}
+
     for measure_idx, measure in enumerate(measures):
-        measure_duration_seconds = beats_to_seconds(measure_duration_beats,
-                                                    tempo)
-        measure_durations.append(measure_duration_seconds)
+        measure_count += 1
 
         # Group notes by clef and track their position within the measure
         clef_positions = {'treble': 0.0, 'bass': 0.0}
 
-        # Sort notes by their ID timestamp to maintain order
-        measure_notes = sorted(measure, key=lambda x: x.get('id', ''))
+        # Sort notes by their ID to maintain order
+        measure_notes = sorted(measure, key=note_id_sort_key)
 
         for note_data in measure_notes:
+            clef = note_data['clef']
+            duration_beats = DURATION_TO_BEATS.get(note_data['duration'], 1.0)
+
             if note_data.get('isRest', False):
                 # For rests, just advance the position
-                duration_beats = DURATION_TO_BEATS.get(note_data['duration'],
-                                                       1.0)
-                clef_positions[note_data['clef']] += duration_beats
+                clef_positions[clef] += duration_beats
                 continue
 
-            clef = note_data['clef']
-
-            # Calculate absolute start time
-            measure_start = sum(measure_durations[:measure_idx])
             beat_offset = clef_positions[clef]
-            start_time = measure_start + beats_to_seconds(beat_offset, tempo)
-
-            # Calculate duration
-            duration_beats = DURATION_TO_BEATS.get(note_data['duration'], 1.0)
-            duration_seconds = beats_to_seconds(duration_beats, tempo)
 
             # Parse note names to MIDI numbers
             try:
@@ -188,21 +407,32 @@ def process_measures(measures, tempo, time_signature):
                 )
                 continue
 
-            # Create note data
+            measure_ids, offsets, durations, pitches, sources = columns_by_clef[clef]
             for midi_note in midi_notes:
-                note_info = {
-                    'start_time': start_time,
-                    'end_time': start_time + duration_seconds,
-                    'midi_note': midi_note,
-                    'velocity': 80,  # Default velocity
-                    'original_data': note_data
-                }
-                notes_by_clef[clef].append(note_info)
+                measure_ids.append(measure_idx)
+                offsets.append(beat_offset)
+                durations.append(duration_beats)
+                pitches.append(midi_note)
+            if keep_sources:
+                sources.extend([note_data] * len(midi_notes))
 
             # Advance position for this clef
             clef_positions[clef] += duration_beats
 
-    return notes_by_clef, measure_durations
+    # Every measure has the same length, so allocate the list in one go
+    measure_durations = [measure_duration_seconds] * measure_count
+
+    # Absolute timing for all notes at once: each measure starts where the
+    # previous ones end
+    measure_starts = np.cumsum([0.0] + measure_durations[:-1])
+    timed_by_clef = {}
+    for clef, (measure_ids, offsets, durations, pitches, sources) in columns_by_clef.items():
+        start_times = (measure_starts[np.array(measure_ids, dtype=np.intp)] +
+                       beats_to_seconds(np.array(offsets), tempo))
+        end_times = start_times + beats_to_seconds(np.array(durations), tempo)
+        timed_by_clef[clef] = (start_times.tolist(), end_times.tolist(), pitches, sources)
+
+    return timed_by_clef, measure_durations
 
 
 def get_instrument_program(instrument_name):
@@ -215,27 +445,11 @@ def get_instrument_program(instrument_name):
     Returns:
         int: MIDI program number
     """
-    instrument_map = {
-        'piano': 'Acoustic Grand Piano',
-        'guitar': 'Acoustic Guitar (nylon)',
-        'cello': 'Cello',
-        'violin': 'Violin',
-        'sax': 'Alto Sax',
-        'saxophone': 'Alto Sax',
-        'drums': 'Acoustic Grand Piano',  # Will be handled specially
-    }
-
-    instrument_display_name = instrument_map.get(instrument_name.lower(),
-                                                 'Acoustic Grand Piano')
+    # Fallback to piano if instrument not found
+    return INSTRUMENT_PROGRAM.get(instrument_name.lower(), _DEFAULT_PROGRAM)
 
-    try:
-        return pretty_midi.instrument_name_to_program(instrument_display_name)
-    except (ValueError, KeyError):
-        # Fallback to piano if instrument not found
-        return pretty_midi.instrument_name_to_program('Acoustic Grand Piano')
 
-
-def create_midi_from_multiple_json(json_files_data, output_tempo=None):
+def create_midi_from_multiple_json(json_files_data, output_tempo=None, max_workers=None):
     """
     Convert multiple VexFlow JSON objects to a single PrettyMIDI object.
     Each JSON represents a separate instrument part.
@@ -243,24 +457,14 @@ def create_midi_from_multiple_json(json_files_data, output_tempo=None):
     Args:
         json_files_data (list): List of parsed JSON data objects
         output_tempo (int, optional): Override tempo for all parts
+        max_workers (int, optional): Build the parts in this many worker
+            processes. Worth it only for several large parts; by default
+            parts are built in this process.
 
     Returns:
         pretty_midi.PrettyMIDI: Generated MIDI object with multiple instruments
     """
-    if not json_files_data:
-        raise ValueError("No JSON data provided")
-
-    # Use tempo from first file or override
-    tempo = output_tempo or json_files_data[0].get('tempo', 120)
-
-    # Use time signature from first file (could be made more sophisticated)
-    time_signature = json_files_data[0].get('timeSignature', {
-        'numerator': 4,
-        'denominator': 4
-    })
-
-    # Use key signature from first file
-    key_signature = json_files_data[0].get('keySignature', 'C')
+    tempo, time_signature, key_signature, parts = _collect_parts(json_files_data, output_tempo)
 
     # Create PrettyMIDI object
     pm = pretty_midi.PrettyMIDI(initial_tempo=tempo)
@@ -280,7 +484,39 @@ def create_midi_from_multiple_json(json_files_data, output_tempo=None):
         except (ValueError, AttributeError):
             print(f"Warning: Could not set key signature '{key_signature}'")
 
+    # Parts are independent, so they can be built in parallel
+    if max_workers and len(parts) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            part_instruments = list(executor.map(_build_part_instruments, *zip(*parts)))
+    else:
+        part_instruments = [_build_part_instruments(*part) for part in parts]
+
+    for instruments in part_instruments:
+        pm.instruments.extend(instruments)
+
+    return pm
+
+
+def _collect_parts(json_files_data, output_tempo=None):
+    """
+    Read the shared header (tempo, time and key signature, all from the first
+    file) and one (measures, instrument_name, tempo, time_signature) tuple
+    per part from parsed VexFlow JSON objects.
+    """
+    if not json_files_data:
+        raise ValueError("No JSON data provided")
+
+    # Use tempo from first file or override
+    tempo = output_tempo or json_files_data[0].get('tempo', 120)
+
+    # Use time signature from first file (could be made more sophisticated)
+    time_signature = json_files_data[0].get('timeSignature', DEFAULT_TIME_SIGNATURE)
+
+    # Use key signature from first file
+    key_signature = json_files_data[0].get('keySignature', 'C')
+
     used_channels = set()
+    parts = []
 
     # Process each JSON file as a separate instrument
     for file_idx, json_data in enumerate(json_files_data):
@@ -306,39 +542,132 @@ def create_midi_from_multiple_json(json_files_data, output_tempo=None):
                 f"Channel {requested_channel} already used, assigned channel {channel} to {instrument_name}"
             )
 
-        # Process measures for this instrument
-        notes_by_clef, _ = process_measures(measures, tempo, time_signature)
+        parts.append((measures, instrument_name, tempo, time_signature))
 
-        # Get instrument program number
-        program = get_instrument_program(instrument_name)
+    return tempo, time_signature, key_signature, parts
 
-        # Create instruments for each clef that has notes
-        for clef, notes in notes_by_clef.items():
-            if not notes:
-                continue
 
-            # Create unique instrument name
-            if len(notes_by_clef) > 1 and any(notes_by_clef.values()):
-                instrument_display_name = f'{instrument_name.title()} ({clef.title()})'
-            else:
-                instrument_display_name = instrument_name.title()
+def _build_part_instruments(measures, instrument_name, tempo, time_signature):
+    """Build the pretty_midi instruments (one per clef with notes) for one part."""
+    instruments = []
 
-            # Create instrument
-            instrument = pretty_midi.Instrument(program=program,
-                                                name=instrument_display_name)
+    for name, program, start_times, end_times, pitches in _part_note_columns(
+            measures, instrument_name, tempo, time_signature):
+        # Create instrument
+        instrument = pretty_midi.Instrument(program=program, name=name)
 
-            # Add notes to instrument
-            for note_info in notes:
-                note = pretty_midi.Note(velocity=note_info['velocity'],
-                                        pitch=note_info['midi_note'],
-                                        start=note_info['start_time'],
-                                        end=note_info['end_time'])
-                instrument.notes.append(note)
+        # Add notes to instrument straight from the columns (default velocity 80)
+        instrument.notes = list(map(pretty_midi.Note, repeat(80), pitches, start_times, end_times))
 
-            # Add instrument to MIDI
-            pm.instruments.append(instrument)
+        instruments.append(instrument)
 
-    return pm
+    return instruments
+
+
+def _part_note_columns(measures, instrument_name, tempo, time_signature):
+    """
+    Return (name, program, start_times, end_times, pitches) for each clef of
+    one part that has notes.
+    """
+    tracks = []
+
+    # Process measures for this instrument
+    columns_by_clef, _ = _process_measure_columns(measures, tempo, time_signature, keep_sources=False)
+
+    # Get instrument program number
+    program = get_instrument_program(instrument_name)
+
+    # Instrument names get a clef suffix to keep them unique
+    base_display_name = instrument_name.title()
+    label_clefs = len(columns_by_clef) > 1 and any(columns[2] for columns in columns_by_clef.values())
+
+    # One track for each clef that has notes
+    for clef, (start_times, end_times, pitches, _) in columns_by_clef.items():
+        if not pitches:
+            continue
+
+        # Create unique instrument name
+        if label_clefs:
+            instrument_display_name = f'{base_display_name} ({clef.title()})'
+        else:
+            instrument_display_name = base_display_name
+
+        tracks.append((instrument_display_name, program, start_times, end_times, pitches))
+
+    return tracks
+
+
+def write_midi_from_multiple_json(json_files_data, midi_file_path, output_tempo=None):
+    """
+    Convert multiple VexFlow JSON objects straight to a MIDI file.
+
+    Writes the same file as create_midi_from_multiple_json(...).write(path),
+    but emits the MIDI events with mido directly instead of building
+    pretty_midi notes first.
+
+    Args:
+        json_files_data (list): List of parsed JSON data objects
+        midi_file_path (str or file): Path or file object to write to
+        output_tempo (int, optional): Override tempo for all parts
+    """
+    tempo, time_signature, key_signature, parts = _collect_parts(json_files_data, output_tempo)
+
+    # Same resolution and tick scale as a PrettyMIDI object created from scratch
+    tick_scale = 60.0 / (tempo * _MIDI_RESOLUTION)
+    mid = mido.MidiFile(ticks_per_beat=_MIDI_RESOLUTION, charset='latin1')
+
+    # Track 0 carries tempo, time signature and key signature at tick 0
+    timing_track = mido.MidiTrack()
+    timing_track.append(mido.MetaMessage(
+        'set_tempo', time=0, tempo=int(6e7 / (60. / (tick_scale * _MIDI_RESOLUTION)))))
+    timing_track.append(mido.MetaMessage(
+        'time_signature', time=0, numerator=time_signature['numerator'],
+        denominator=time_signature['denominator']))
+    if key_signature != 'C':
+        try:
+            key_number = pretty_midi.key_name_to_key_number(key_signature)
+            timing_track.append(mido.MetaMessage(
+                'key_signature', time=0, key=_MIDO_KEY_NAMES[key_number]))
+        except (ValueError, AttributeError):
+            print(f"Warning: Could not set key signature '{key_signature}'")
+    timing_track.append(mido.MetaMessage('end_of_track', time=1))
+    mid.tracks.append(timing_track)
+
+    tracks = [track for part in parts for track in _part_note_columns(*part)]
+    for track_idx, (name, program, start_times, end_times, pitches) in enumerate(tracks):
+        channel = _MIDI_CHANNELS[track_idx % len(_MIDI_CHANNELS)]
+        mid.tracks.append(_note_track(name, program, channel, tick_scale,
+                                      start_times, end_times, pitches))
+
+    if hasattr(midi_file_path, 'write'):
+        mid.save(file=midi_file_path)
+    else:
+        mid.save(filename=midi_file_path)
+
+
+def _note_track(name, program, channel, tick_scale, start_times, end_times, pitches):
+    """Build one instrument's mido track from its note columns."""
+    pitches = np.asarray(pitches, dtype=np.int64)
+    count = len(pitches)
+
+    # Note-ons then note-offs (note_on with velocity 0), in tick order; at
+    # the same tick events sort by pitch, then velocity, so offs come first
+    ticks = np.rint(np.concatenate((start_times, end_times)) / tick_scale).astype(np.int64)
+    notes = np.concatenate((pitches, pitches))
+    velocities = np.concatenate((np.full(count, 80), np.zeros(count, dtype=np.int64)))
+    order = np.lexsort((velocities, notes, ticks))
+    ticks = ticks[order]
+    deltas = np.diff(ticks, prepend=0)
+
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('track_name', time=0, name=name))
+    track.append(mido.Message('program_change', time=0, program=program, channel=channel))
+    track.extend(mido.Message('note_on', channel=channel, note=note, velocity=velocity, time=delta)
+                 for note, velocity, delta in zip(notes[order].tolist(),
+                                                  velocities[order].tolist(),
+                                                  deltas.tolist()))
+    track.append(mido.MetaMessage('end_of_track', time=1))
+    return track
 
 
 def create_midi_from_json(json_data):
@@ -355,6 +684,64 @@ def create_midi_from_json(json_data):
     return create_midi_from_multiple_json([json_data])
 
 
+def create_midi_from_json_stream(json_file_paths, output_tempo=None):
+    """
+    Convert VexFlow JSON files to a single PrettyMIDI object, reading each
+    file's measures one at a time.
+
+    With ijson installed, only the current measure of a file is held in
+    memory as parsed JSON; otherwise each file is loaded in full.
+
+    Args:
+        json_file_paths (list): Paths to JSON files, one instrument part each
+        output_tempo (int, optional): Override tempo for all parts
+
+    Returns:
+        pretty_midi.PrettyMIDI: Generated MIDI object with multiple instruments
+    """
+    if ijson is None:
+        return create_midi_from_multiple_json(
+            [read_json_file(path) for path in json_file_paths], output_tempo)
+
+    parts = []
+    for json_file_path in json_file_paths:
+        part = _read_json_header(json_file_path)
+        part['measures'] = _stream_json_measures(json_file_path)
+        parts.append(part)
+
+    return create_midi_from_multiple_json(parts, output_tempo)
+
+
+# Top-level VexFlow JSON fields read ahead of the measures when streaming
+_JSON_HEADER_FIELDS = ('tempo', 'keySignature', 'instrument', 'midiChannel')
+
+
+def _read_json_header(json_file_path):
+    """Read every top-level field except the measures with ijson."""
+    header = {}
+    with open(json_file_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == 'measures' and event == 'start_array':
+                # Files written by create_json_from_midi put every header
+                # field first, so stop before tokenizing the measures. If
+                # a field is still missing, keep scanning: it may come
+                # after the measures.
+                if all(field in header for field in _JSON_HEADER_FIELDS) and \
+                        'timeSignature' in header:
+                    break
+            elif prefix in _JSON_HEADER_FIELDS and event in ('string', 'number'):
+                header[prefix] = value
+            elif prefix.startswith('timeSignature.') and event == 'number':
+                header.setdefault('timeSignature', {})[prefix[len('timeSignature.'):]] = value
+    return header
+
+
+def _stream_json_measures(json_file_path):
+    """Yield a JSON file's measures one at a time with ijson."""
+    with open(json_file_path, 'rb') as f:
+        yield from ijson.items(f, 'measures.item', use_float=True)
+
+
 def beats_to_duration_symbol(beats):
     """
     Convert beats to the closest VexFlow duration symbol.
@@ -365,19 +752,18 @@ def beats_to_duration_symbol(beats):
     Returns:
         str: VexFlow duration symbol
     """
-    # Find the closest duration
-    closest_duration = 'q'  # Default to quarter note
-    closest_diff = float('inf')
-
-    for symbol, duration_beats in DURATION_TO_BEATS.items():
-        diff = abs(beats - duration_beats)
-        if diff < closest_diff:
-            closest_diff = diff
-            closest_duration = symbol
+    # Durations on the 32nd-note grid map straight to their symbol
+    eighths = float(beats * 8)
+    if eighths.is_integer():
+        symbol = _EIGHTHS_TO_DURATION_SYMBOL.get(int(eighths))
+        if symbol is not None:
+            return symbol
 
-    return closest_duration
+    # Otherwise find the closest duration (first match wins on ties)
+    return _closest_duration_symbol(beats, _DURATION_ITEMS)
 
 
+@lru_cache(maxsize=128)
 def beats_to_duration_symbol_improved(beats, allow_compound=True):
     """
     Convert beats to VexFlow duration symbol with better logic.
@@ -389,27 +775,36 @@ def beats_to_duration_symbol_improved(beats, allow_compound=True):
     Returns:
         str: VexFlow duration symbol
     """
-    # Handle exact matches first
-    for symbol, duration_beats in DURATION_TO_BEATS.items():
-        if abs(beats - duration_beats) < 0.001:  # Very small tolerance for floating point
-            return symbol
-    
-    # If no exact match, find closest
-    closest_duration = 'q'  # Default to quarter note
+    # Exact matches (within floating point tolerance) and, when compound
+    # durations are allowed, the closest duration overall
+    symbol = beats_to_duration_symbol(beats)
+    if allow_compound or abs(beats - DURATION_TO_BEATS[symbol]) < 0.001:
+        return symbol
+
+    # Otherwise the closest simple duration (first match wins on ties)
+    return _closest_duration_symbol(beats, _SIMPLE_DURATION_ITEMS)
+
+
+def _closest_duration_symbol(beats, duration_items):
+    """Symbol of the first (symbol, beats) pair closest to beats."""
+    closest_symbol = 'q'  # Default to quarter note
     closest_diff = float('inf')
-    
-    # Prioritize simple durations over dotted ones if allow_compound is False
-    duration_items = list(DURATION_TO_BEATS.items())
-    if not allow_compound:
-        duration_items = [(k, v) for k, v in duration_items if '.' not in k]
-    
+
     for symbol, duration_beats in duration_items:
         diff = abs(beats - duration_beats)
         if diff < closest_diff:
             closest_diff = diff
-            closest_duration = symbol
-    
-    return closest_duration
+            closest_symbol = symbol
+
+    return closest_symbol
+
+
+@lru_cache(maxsize=2048)
+def _chord_name(midi_notes):
+    """VexFlow name for a pitch-sorted tuple of MIDI notes, e.g. '(C4 E4 G4)'."""
+    if len(midi_notes) == 1:
+        return _PITCH_NAMES[midi_notes[0]]
+    return '(' + ' '.join([_PITCH_NAMES[midi_note] for midi_note in midi_notes]) + ')'
 
 
 def midi_notes_to_name(midi_notes):
@@ -427,11 +822,15 @@ def midi_notes_to_name(midi_notes):
 
     note_names = []
     for midi_note in sorted(midi_notes):
-        try:
-            note_name = pretty_midi.note_number_to_name(midi_note)
-            note_names.append(note_name)
-        except (ValueError, IndexError):
-            continue
+        note_name = _PITCH_NAME_BY_NUMBER.get(midi_note)
+        if note_name is None:
+            # Outside the MIDI range or not a whole number: let pretty_midi
+            # round or extend it
+            try:
+                note_name = pretty_midi.note_number_to_name(midi_note)
+            except (ValueError, IndexError):
+                continue
+        note_names.append(note_name)
 
     if len(note_names) == 1:
         return note_names[0]
@@ -462,16 +861,7 @@ def determine_instrument_name(pm):
         if not inst.is_drum:
             try:
                 program_name = pretty_midi.program_to_instrument_name(inst.program)
-                instrument_map = {
-                    'Acoustic Grand Piano': 'piano',
-                    'Acoustic Guitar (nylon)': 'guitar',
-                    'Acoustic Guitar (steel)': 'guitar',
-                    'Electric Guitar (clean)': 'guitar',
-                    'Cello': 'cello',
-                    'Violin': 'violin',
-                    'Alto Sax': 'sax',
-                }
-                return instrument_map.get(program_name, 'piano')
+                return PROGRAM_NAME_TO_INSTRUMENT.get(program_name, 'piano')
             except (ValueError, AttributeError):
                 pass
     return 'piano'
@@ -483,69 +873,61 @@ def analyze_measure_clef_distribution(time_groups):
     clef_loads = {'treble': 0, 'bass': 0}
     clef_complexity = {'treble': 0, 'bass': 0}
     
-    for start_time, time_group in time_groups.items():
-        for duration_beats, duration_group in time_group.items():
+    for time_group in time_groups.values():
+        for duration_group in time_group.values():
+            # Chords are more complex: each note counts the chord's size
+            group_size = len(duration_group)
+            complexity = group_size if group_size > 1 else 0
             for note in duration_group:
                 # Count notes per clef
                 default_clef = 'treble' if note['midi_note'] >= 60 else 'bass'
                 clef_loads[default_clef] += 1
-                
-                # Count complexity (chords = more complex)
-                if len(duration_group) > 1:
-                    clef_complexity[default_clef] += len(duration_group)
+                clef_complexity[default_clef] += complexity
     
     return clef_loads, clef_complexity
 
 
-def determine_clef_with_load_balancing(note_group, measure_context):
+def _load_balanced_treble_mask(lowest_note, highest_note, load_difference):
+    """
+    Branchless form of the load-balanced clef rules.
+
+    Works on plain ints or element-wise on NumPy arrays; True means treble.
+    """
+    # Below A3 = definitely bass, above G4 = definitely treble. In between,
+    # an overloaded clef (difference > 3 beats) pushes the group to the
+    # other one; otherwise only groups reaching below C4 and topping out
+    # at F4 stay in the bass.
+    return (highest_note >= 57) & ((lowest_note >= 67) | (load_difference < -3) |
+                                   ((load_difference <= 3) &
+                                    ((lowest_note >= 60) | (highest_note > 65))))
+
+
+def determine_clef_with_load_balancing(note_group, measure_context, is_sorted=False):
     """
     Determine clef considering both note range and measure load balancing.
+    Pass is_sorted=True when note_group is already sorted by pitch.
     """
     if not note_group:
         return 'treble'
     
-    note_group.sort(key=lambda x: x['midi_note'])
-    lowest_note = note_group[0]['midi_note']
-    highest_note = note_group[-1]['midi_note']
+    lowest_note, highest_note = _pitch_range(note_group, is_sorted)
     
     # Get current clef loads from measure context
-    treble_load = measure_context.get('treble_load', 0)
-    bass_load = measure_context.get('bass_load', 0)
-    
-    # Clear cases - no balancing needed
-    if highest_note < 57:  # Below A3 = definitely bass
-        return 'bass'
-    elif lowest_note >= 67:  # Above G4 = definitely treble
-        return 'treble'
-    
-    # Borderline cases (A3 to G4) - use load balancing
-    
-    # If one clef is significantly overloaded, prefer the other
-    load_difference = treble_load - bass_load
-    
-    if load_difference > 3:  # Treble overloaded
-        return 'bass'
-    elif load_difference < -3:  # Bass overloaded
-        return 'treble'
-    
-    # For borderline notes, use musical logic
-    if lowest_note < 60:  # Contains notes below C4
-        if highest_note <= 65:  # Up to F4 - could be bass
-            return 'bass'
-        else:  # Spans too high - treble
-            return 'treble'
-    else:  # All notes C4 and above
-        return 'treble'
+    load_difference = measure_context.get('treble_load', 0) - measure_context.get('bass_load', 0)
 
+    return _CLEF_NAMES[bool(_load_balanced_treble_mask(lowest_note, highest_note, load_difference))]
 
-def split_complex_chord_across_clefs(note_group):
+
+def split_complex_chord_across_clefs(note_group, is_sorted=False):
     """
     Split a complex chord across treble and bass clefs if needed.
+    Pass is_sorted=True when note_group is already sorted by pitch.
     """
     if len(note_group) <= 3:
         return None  # Don't split simple chords
     
-    note_group.sort(key=lambda x: x['midi_note'])
+    if not is_sorted:
+        note_group.sort(key=itemgetter('midi_note'))
     
     # Split point around C4 (MIDI 60)
     bass_notes = [n for n in note_group if n['midi_note'] < 62]  # Below D4
@@ -559,15 +941,43 @@ def split_complex_chord_across_clefs(note_group):
         }
     
     return None
+
+
+def collect_note_arrays(pm):
+    """
+    Gather the notes of all non-drum instruments into flat NumPy arrays.
+
+    Args:
+        pm (pretty_midi.PrettyMIDI): Loaded MIDI data
+
+    Returns:
+        tuple: (pitches, starts, ends) arrays, in instrument order
+    """
+    notes = [note for inst in pm.instruments if not inst.is_drum for note in inst.notes]
+    count = len(notes)
+
+    pitches = np.fromiter((note.pitch for note in notes), np.int8, count)
+    starts = np.fromiter((note.start for note in notes), np.float64, count)
+    ends = np.fromiter((note.end for note in notes), np.float64, count)
+
+    return pitches, starts, ends
+
+
 def create_json_from_midi(midi_file_path, quantize_resolution=0.125, manual_tempo=142):
     """
     MIDI to JSON with smart clef balancing and measure splitting.
     Maintains 99% accuracy while preventing VexFlow "too many ticks" errors.
+
+    midi_file_path may also be an open file or an already loaded
+    pretty_midi.PrettyMIDI object, which skips parsing the file again.
     """
-    try:
-        pm = pretty_midi.PrettyMIDI(midi_file_path)
-    except Exception as e:
-        raise ValueError(f"Could not load MIDI file: {e}")
+    if isinstance(midi_file_path, pretty_midi.PrettyMIDI):
+        pm = midi_file_path
+    else:
+        try:
+            pm = pretty_midi.PrettyMIDI(midi_file_path)
+        except Exception as e:
+            raise ValueError(f"Could not load MIDI file: {e}")
 
     if not pm.instruments:
         raise ValueError("MIDI file contains no instruments")
@@ -584,57 +994,77 @@ def create_json_from_midi(midi_file_path, quantize_resolution=0.125, manual_temp
         except (IndexError, ValueError, AttributeError):
             pass
 
-    time_signature = {'numerator': 4, 'denominator': 4}
+    # Copied so callers can edit the returned JSON without touching the default
+    time_signature = dict(DEFAULT_TIME_SIGNATURE)
     if pm.time_signature_changes:
         ts = pm.time_signature_changes[0]
         time_signature = {'numerator': ts.numerator, 'denominator': ts.denominator}
 
     # Calculate timing (preserve accuracy)
     measure_duration_seconds = (4.0 * 60.0) / tempo
-    beats_per_clef_limit = (time_signature['numerator'] * 4.0) / time_signature['denominator']
+    beats_per_clef_limit = measure_length_beats(time_signature['numerator'], time_signature['denominator'])
     
     print(f"Measure duration: {measure_duration_seconds:.3f} seconds")
     print(f"Beats per clef limit: {beats_per_clef_limit}")
 
-    # Process notes with same precision as before
-    all_notes = []
-    for inst in pm.instruments:
-        if inst.is_drum:
-            continue
-
-        for note in inst.notes:
-            quantized_start = quantize_time(note.start, quantize_resolution, tempo)
-            measure_num = int(quantized_start // measure_duration_seconds)
-            duration_beats = calculate_duration_with_quantization(
-                note.start, note.end, tempo, quantize_resolution
-            )
-            
-            all_notes.append({
-                'start_time': quantized_start,
-                'measure': measure_num,
-                'midi_note': note.pitch,
-                'duration_beats': duration_beats,
-                'note_name': pretty_midi.note_number_to_name(note.pitch),
-                'original_start': note.start,
-                'original_end': note.end
-            })
-
-    all_notes.sort(key=lambda x: (x['measure'], x['start_time'], x['midi_note']))
-
-    print(f"Processed {len(all_notes)} notes into {max([n['measure'] for n in all_notes]) + 1 if all_notes else 0} measures")
+    # Pull every non-drum note into flat arrays once, then quantize them all
+    # together with the same arithmetic as quantize_time (start times) and
+    # calculate_duration_with_quantization (durations, kept in beats)
+    pitches, starts, ends = collect_note_arrays(pm)
+
+    start_ticks = np.round((starts * tempo) / 60.0 / quantize_resolution)
+    end_ticks = np.round((ends * tempo) / 60.0 / quantize_resolution)
+    start_beats = start_ticks * quantize_resolution
+    quantized_starts = beats_to_seconds(start_beats, tempo)
+    measure_nums = (quantized_starts // measure_duration_seconds).astype(np.int64)
+    durations_beats = np.maximum(end_ticks * quantize_resolution - start_beats, quantize_resolution)
+    # Durations are matched to symbols at 0.01-beat precision, all at once
+    durations_beats = np.round(durations_beats * 100) / 100
+    duration_symbols = _safe_duration_indices(durations_beats, beats_per_clef_limit)
+    # Integer positions on the quantization grid (used as group keys)
+    start_ticks = start_ticks.astype(np.int64)
+    duration_ticks = np.maximum(end_ticks.astype(np.int64) - start_ticks, 1)
+
+    # Sort by (measure, start, duration, pitch) into one contiguous note
+    # table, so each measure's slice is already grouped into events
+    order = np.lexsort((pitches, duration_ticks, start_ticks, measure_nums))
+    all_notes = np.empty(len(order), dtype=NOTE_TABLE_DTYPE)
+    all_notes['measure'] = measure_nums[order]
+    all_notes['start_time'] = quantized_starts[order]
+    all_notes['start_tick'] = start_ticks[order]
+    all_notes['duration_ticks'] = duration_ticks[order]
+    all_notes['duration_beats'] = durations_beats[order]
+    all_notes['duration_symbol'] = duration_symbols[order]
+    all_notes['midi_note'] = pitches[order]
+
+    # Notes sharing a start tick and duration form one event (preserve chord
+    # accuracy); the table is sorted that way, so number the events in one pass
+    if len(all_notes):
+        new_event = np.empty(len(all_notes), dtype=bool)
+        new_event[0] = True
+        new_event[1:] = ((np.diff(all_notes['start_tick']) != 0) |
+                         (np.diff(all_notes['duration_ticks']) != 0))
+        all_notes['event'] = np.cumsum(new_event)
+
+    # Notes are sorted by measure, so the last one carries the highest index
+    original_measure_count = int(all_notes['measure'][-1]) + 1 if len(all_notes) else 0
+
+    print(f"Processed {len(all_notes)} notes into {original_measure_count} measures")
 
     # NEW: Smart measure processing with clef load balancing
     measures = []
     
-    if all_notes:
-        max_measure = max(note['measure'] for note in all_notes)
+    if len(all_notes):
+        # The table is sorted by measure: cut it wherever the measure changes
+        boundaries = np.flatnonzero(np.diff(all_notes['measure'])) + 1
+        next_measure_idx = 0
 
-        for measure_idx in range(max_measure + 1):
-            measure_notes = [n for n in all_notes if n['measure'] == measure_idx]
-            
-            if not measure_notes:
-                measures.append([])
-                continue
+        for measure_notes in np.split(all_notes, boundaries):
+            measure_idx = int(measure_notes['measure'][0])
+
+            # Measures without any notes stay empty
+            measures.extend([] for _ in range(measure_idx - next_measure_idx))
+            next_measure_idx = measure_idx + 1
 
             # Process this measure with smart clef balancing
             processed_measures = process_measure_with_clef_balancing(
@@ -653,7 +1083,7 @@ def create_json_from_midi(midi_file_path, quantize_resolution=0.125, manual_temp
         'measures': measures
     }
 
-    print(f"Final result: {len(measures)} measures (split from {max_measure + 1 if all_notes else 0} original)")
+    print(f"Final result: {len(measures)} measures (split from {original_measure_count} original)")
     
     return json_data
 
@@ -662,265 +1092,221 @@ def process_measure_with_clef_balancing(measure_notes, original_measure_idx, bea
     """
     Process a single measure with smart clef balancing and splitting.
     Returns a list of measures (may split into multiple if needed).
+
+    measure_notes is a NOTE_TABLE_DTYPE array sorted by start tick, duration
+    and pitch.
     """
-    print(f"\nProcessing measure {original_measure_idx} with {len(measure_notes)} notes")
+    logger.debug("Processing measure %d with %d notes", original_measure_idx, len(measure_notes))
     
-    # Group by start time (preserve timing accuracy)
-    time_groups = {}
-    for note in measure_notes:
-        start_key = round(note['start_time'], 2)  # 10ms precision
-        if start_key not in time_groups:
-            time_groups[start_key] = []
-        time_groups[start_key].append(note)
-
-    # Group by duration within each time group (preserve chord accuracy)
-    all_note_events = []
-    for start_time in sorted(time_groups.keys()):
-        time_group = time_groups[start_time]
-        
-        duration_groups = {}
-        for note in time_group:
-            duration_key = round(note['duration_beats'], 2)
-            if duration_key not in duration_groups:
-                duration_groups[duration_key] = []
-            duration_groups[duration_key].append(note)
-
-        # Create note events (single notes or chords)
-        for duration_beats in sorted(duration_groups.keys()):
-            duration_group = duration_groups[duration_beats]
-            safe_duration = beats_to_duration_symbol_vexflow_safe(duration_beats, beats_per_clef_limit)
-            
-            all_note_events.append({
-                'start_time': start_time,
-                'duration_beats': duration_beats,
-                'safe_duration': safe_duration,
-                'notes': duration_group
-            })
-
-    # NOW: Distribute events across clefs and split measures if needed
+    # Notes are grouped into events by the table's precomputed event ids
+    rows = zip(measure_notes['event'].tolist(),
+               measure_notes['start_time'].tolist(),
+               measure_notes['duration_beats'].tolist(),
+               measure_notes['duration_symbol'].tolist(),
+               measure_notes['midi_note'].tolist())
+
+    # NOW: Distribute events across clefs and split measures if needed. The
+    # events are grouped lazily as the splitter consumes them.
     return distribute_events_with_measure_splitting(
-        all_note_events, original_measure_idx, beats_per_clef_limit
+        _iter_note_events(rows), original_measure_idx, beats_per_clef_limit
     )
 
 
+def _iter_note_events(rows):
+    """
+    Yield a NoteEvent (single note or chord) for each run of equal group keys
+    in rows of (event, start_time, duration_beats, duration_symbol, midi_note).
+    """
+    for _, group in groupby(rows, key=itemgetter(0)):
+        group = list(group)
+        _, start_time, duration_beats, duration_symbol, _ = group[0]
+
+        yield NoteEvent(start_time, duration_beats, _SAFE_DURATION_SYMBOLS[duration_symbol],
+                        _SAFE_DURATION_BEATS[duration_symbol], tuple([row[4] for row in group]))
+
+
 def distribute_events_with_measure_splitting(note_events, original_measure_idx, beats_per_clef_limit):
     """
     Distribute note events across clefs and split into multiple measures if needed.
     """
     result_measures = []
+    result_loads = []  # Per-clef beat totals of each finished measure
     current_measure_data = []
-    current_clef_loads = {'treble': 0.0, 'bass': 0.0}
+    # Beats per clef, indexed by clef id (_BASS, _TREBLE); the clef rules
+    # return a treble flag that indexes it directly
+    current_clef_loads = [0.0, 0.0]
     current_measure_idx = original_measure_idx
+    id_prefix = f'converted-{current_measure_idx}-'
     note_id_counter = 1
+
+    def emit(name, clef_id):
+        """Append a note or chord of the current event to the current measure."""
+        nonlocal note_id_counter
+        current_measure_data.append({
+            'id': id_prefix + str(note_id_counter),
+            'name': name,
+            'clef': _CLEF_NAMES[clef_id],
+            'duration': safe_duration,
+            'measure': current_measure_idx,
+            'isRest': False
+        })
+        current_clef_loads[clef_id] += duration_beats
+        note_id_counter += 1
     
+    # Small tolerance so rounded durations that exactly fill a clef still fit
+    clef_limit = beats_per_clef_limit + 0.01
+
     for event in note_events:
-        notes = event['notes']
-        duration_beats = DURATION_TO_BEATS.get(event['safe_duration'], 1.0)
+        pitches = event.pitches
+        safe_duration = event.safe_duration
+        duration_beats = event.safe_beats
+        bass_load, treble_load = current_clef_loads
         
         # Determine how to handle this event
-        if len(notes) == 1:
+        if len(pitches) == 1:
             # Single note - assign to best clef
-            note = notes[0]
-            best_clef = choose_clef_with_load_balancing(
-                note['midi_note'], current_clef_loads, beats_per_clef_limit
-            )
+            midi_note = pitches[0]
+            best_clef = _note_is_treble(midi_note, treble_load, bass_load)
             
             # Check if this would overflow the chosen clef
-            if current_clef_loads[best_clef] + duration_beats > beats_per_clef_limit + 0.01:
+            if current_clef_loads[best_clef] + duration_beats > clef_limit:
                 # Need to start a new measure
                 if current_measure_data:  # Don't create empty measures
                     result_measures.append(current_measure_data)
+                    result_loads.append(current_clef_loads)
                     current_measure_data = []
-                    current_clef_loads = {'treble': 0.0, 'bass': 0.0}
+                    current_clef_loads = [0.0, 0.0]
                     current_measure_idx = len(result_measures) + original_measure_idx
+                    id_prefix = f'converted-{current_measure_idx}-'
                     note_id_counter = 1
             
             # Add the note
-            current_measure_data.append({
-                'id': f'converted-{current_measure_idx}-{note_id_counter}',
-                'name': note['note_name'],
-                'clef': best_clef,
-                'duration': event['safe_duration'],
-                'measure': current_measure_idx,
-                'isRest': False
-            })
-            
-            current_clef_loads[best_clef] += duration_beats
-            note_id_counter += 1
+            emit(_PITCH_NAMES[midi_note], best_clef)
             
         else:
-            # Chord - decide whether to split or keep together
-            notes.sort(key=lambda x: x['midi_note'])
+            # Chord - decide whether to split or keep together. Notes arrive
+            # sorted by pitch from the note table, so the range is at the ends.
+            lowest = pitches[0]
+            highest = pitches[-1]
             
             # Try to fit the whole chord in one clef
-            chord_clef = choose_chord_clef_with_load_balancing(
-                notes, current_clef_loads, beats_per_clef_limit
-            )
+            chord_clef = _chord_is_treble(lowest, highest, treble_load, bass_load)
             
-            if chord_clef and current_clef_loads[chord_clef] + duration_beats <= beats_per_clef_limit + 0.01:
+            if current_clef_loads[chord_clef] + duration_beats <= clef_limit:
                 # Whole chord fits in one clef
-                note_names = [n['note_name'] for n in notes]
-                chord_name = f"({' '.join(note_names)})" if len(note_names) > 1 else note_names[0]
-                
-                current_measure_data.append({
-                    'id': f'converted-{current_measure_idx}-{note_id_counter}',
-                    'name': chord_name,
-                    'clef': chord_clef,
-                    'duration': event['safe_duration'],
-                    'measure': current_measure_idx,
-                    'isRest': False
-                })
-                
-                current_clef_loads[chord_clef] += duration_beats
-                note_id_counter += 1
+                emit(_chord_name(pitches), chord_clef)
                 
             else:
-                # Need to split the chord or start new measure
-                
-                # Check if we can split the chord across clefs
-                bass_notes = [n for n in notes if n['midi_note'] < 60]  # Below C4
-                treble_notes = [n for n in notes if n['midi_note'] >= 60]  # C4 and above
-                
-                can_split = (len(bass_notes) >= 1 and len(treble_notes) >= 1 and
-                           current_clef_loads['bass'] + duration_beats <= beats_per_clef_limit + 0.01 and
-                           current_clef_loads['treble'] + duration_beats <= beats_per_clef_limit + 0.01)
+                # The chord overflows its clef: start a new measure for it.
+                # (Splitting it across clefs would need room in both clefs,
+                # including the one that just overflowed.)
+                if current_measure_data:  # Don't create empty measures
+                    result_measures.append(current_measure_data)
+                    result_loads.append(current_clef_loads)
+                    current_measure_data = []
+                    current_clef_loads = [0.0, 0.0]
+                    current_measure_idx = len(result_measures) + original_measure_idx
+                    id_prefix = f'converted-{current_measure_idx}-'
+                    note_id_counter = 1
                 
-                if can_split:
-                    # Split chord across clefs
-                    print(f"  Splitting chord across clefs: {len(bass_notes)} bass, {len(treble_notes)} treble")
-                    
-                    # Bass part
-                    if bass_notes:
-                        bass_names = [n['note_name'] for n in bass_notes]
-                        bass_chord_name = f"({' '.join(bass_names)})" if len(bass_names) > 1 else bass_names[0]
-                        
-                        current_measure_data.append({
-                            'id': f'converted-{current_measure_idx}-{note_id_counter}',
-                            'name': bass_chord_name,
-                            'clef': 'bass',
-                            'duration': event['safe_duration'],
-                            'measure': current_measure_idx,
-                            'isRest': False
-                        })
-                        
-                        current_clef_loads['bass'] += duration_beats
-                        note_id_counter += 1
-                    
-                    # Treble part
-                    if treble_notes:
-                        treble_names = [n['note_name'] for n in treble_notes]
-                        treble_chord_name = f"({' '.join(treble_names)})" if len(treble_names) > 1 else treble_names[0]
-                        
-                        current_measure_data.append({
-                            'id': f'converted-{current_measure_idx}-{note_id_counter}',
-                            'name': treble_chord_name,
-                            'clef': 'treble',
-                            'duration': event['safe_duration'],
-                            'measure': current_measure_idx,
-                            'isRest': False
-                        })
-                        
-                        current_clef_loads['treble'] += duration_beats
-                        note_id_counter += 1
+                # Add the whole chord to the new measure
+                default_clef = _chord_is_treble(
+                    lowest, highest, current_clef_loads[_TREBLE], current_clef_loads[_BASS]
+                )
                 
-                else:
-                    # Start new measure for this chord
-                    if current_measure_data:  # Don't create empty measures
-                        result_measures.append(current_measure_data)
-                        current_measure_data = []
-                        current_clef_loads = {'treble': 0.0, 'bass': 0.0}
-                        current_measure_idx = len(result_measures) + original_measure_idx
-                        note_id_counter = 1
-                    
-                    # Add the whole chord to the new measure
-                    default_clef = choose_chord_clef_with_load_balancing(
-                        notes, current_clef_loads, beats_per_clef_limit
-                    ) or 'treble'
-                    
-                    note_names = [n['note_name'] for n in notes]
-                    chord_name = f"({' '.join(note_names)})" if len(note_names) > 1 else note_names[0]
-                    
-                    current_measure_data.append({
-                        'id': f'converted-{current_measure_idx}-{note_id_counter}',
-                        'name': chord_name,
-                        'clef': default_clef,
-                        'duration': event['safe_duration'],
-                        'measure': current_measure_idx,
-                        'isRest': False
-                    })
-                    
-                    current_clef_loads[default_clef] += duration_beats
-                    note_id_counter += 1
+                emit(_chord_name(pitches), default_clef)
 
     # Add the final measure
     if current_measure_data:
         result_measures.append(current_measure_data)
+        result_loads.append(current_clef_loads)
 
     # Log the results
-    print(f"  Split into {len(result_measures)} measure(s)")
-    for i, measure in enumerate(result_measures):
-        clef_loads = {'treble': 0, 'bass': 0}
-        for note in measure:
-            beats = DURATION_TO_BEATS.get(note['duration'], 1.0)
-            clef_loads[note['clef']] += beats
-        print(f"    Measure {original_measure_idx + i}: treble={clef_loads['treble']:.1f}, bass={clef_loads['bass']:.1f}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Split into %d measure(s)", len(result_measures))
+        for i, clef_loads in enumerate(result_loads):
+            logger.debug("Measure %d: treble=%.1f, bass=%.1f",
+                         original_measure_idx + i, clef_loads[_TREBLE], clef_loads[_BASS])
 
     return result_measures
 
 
 def choose_clef_with_load_balancing(midi_note, current_loads, beats_per_clef_limit):
     """Choose the best clef for a single note considering current loads."""
-    # Default clef based on pitch
-    default_clef = 'treble' if midi_note >= 60 else 'bass'
-    
-    # Check if default clef has room
-    treble_load = current_loads['treble']
-    bass_load = current_loads['bass']
-    
-    # If default clef is getting full, consider the other
-    if default_clef == 'treble' and treble_load > bass_load + 1.0:
-        # Treble is significantly more loaded, consider bass for borderline notes
-        if 55 <= midi_note <= 65:  # G3 to F4 - can go either way
-            return 'bass'
-    elif default_clef == 'bass' and bass_load > treble_load + 1.0:
-        # Bass is significantly more loaded, consider treble for borderline notes  
-        if 55 <= midi_note <= 65:  # G3 to F4 - can go either way
-            return 'treble'
-    
-    return default_clef
+    return _CLEF_NAMES[bool(_note_is_treble(midi_note, current_loads['treble'], current_loads['bass']))]
+
+
+def choose_clef_with_load_balancing_batch(midi_notes, treble_loads, bass_loads):
+    """
+    Vectorized choose_clef_with_load_balancing for independent notes.
+
+    Args:
+        midi_notes (array-like): MIDI note numbers
+        treble_loads (array-like or float): Treble load seen by each note
+        bass_loads (array-like or float): Bass load seen by each note
 
+    Returns:
+        numpy.ndarray: 'treble' or 'bass' for each note
+    """
+    mask = _note_is_treble(np.asarray(midi_notes), np.asarray(treble_loads), np.asarray(bass_loads))
+    return np.where(mask, 'treble', 'bass')
 
-def choose_chord_clef_with_load_balancing(notes, current_loads, beats_per_clef_limit):
-    """Choose the best clef for a chord considering current loads."""
+
+def _note_is_treble(midi_note, treble_load, bass_load):
+    """
+    Load-balanced single-note clef rule; True means treble.
+
+    Works on plain numbers or element-wise on NumPy arrays.
+    """
+    # C4 and above go to the treble and lower notes to the bass, except that
+    # borderline notes (G3 to F4) move to the other clef when their own clef
+    # is loaded more than a beat beyond it
+    return (((midi_note >= 60) & ((midi_note > 65) | (treble_load <= bass_load + 1.0))) |
+            ((midi_note >= 55) & (bass_load > treble_load + 1.0)))
+
+
+def choose_chord_clef_with_load_balancing(notes, current_loads, beats_per_clef_limit, is_sorted=False):
+    """
+    Choose the best clef for a chord considering current loads.
+    Pass is_sorted=True when notes are already sorted by pitch.
+    """
     if not notes:
         return 'treble'
     
-    notes.sort(key=lambda x: x['midi_note'])
-    lowest = notes[0]['midi_note']
-    highest = notes[-1]['midi_note']
-    
-    # Clear cases
-    if highest < 57:  # Below A3
-        return 'bass'
-    elif lowest >= 67:  # Above G4
-        return 'treble'
-    
-    # Borderline case - use load balancing
-    treble_load = current_loads['treble']
-    bass_load = current_loads['bass']
-    
-    # If one clef is much more loaded, prefer the other
-    if treble_load > bass_load + 1.5:
-        return 'bass'
-    elif bass_load > treble_load + 1.5:
-        return 'treble'
-    
-    # Default based on note range
-    if lowest < 60:  # Contains notes below C4
-        return 'bass'
-    else:
-        return 'treble'
-    
+    lowest_note, highest_note = _pitch_range(notes, is_sorted)
+    return _CLEF_NAMES[bool(_chord_is_treble(lowest_note, highest_note,
+                                             current_loads['treble'], current_loads['bass']))]
+
+
+def _pitch_range(notes, is_sorted=False):
+    """Lowest and highest midi_note of a non-empty list of note dicts."""
+    if is_sorted:
+        return notes[0]['midi_note'], notes[-1]['midi_note']
+
+    lowest = highest = notes[0]['midi_note']
+    for note in notes:
+        midi_note = note['midi_note']
+        if midi_note < lowest:
+            lowest = midi_note
+        elif midi_note > highest:
+            highest = midi_note
+    return lowest, highest
+
+
+def _chord_is_treble(lowest, highest, treble_load, bass_load):
+    """
+    Load-balanced chord clef rule, taking the chord's pitch range and loads.
+
+    Works on plain numbers or element-wise on NumPy arrays; True means treble.
+    """
+    # Below A3 = bass, above G4 = treble. In between, a clef loaded more
+    # than 1.5 beats beyond the other pushes the chord to the other one;
+    # otherwise chords reaching below C4 go to the bass.
+    return (highest >= 57) & ((lowest >= 67) | (bass_load > treble_load + 1.5) |
+                              ((treble_load <= bass_load + 1.5) & (lowest >= 60)))
+
+
+@lru_cache(maxsize=128)
 def beats_to_duration_symbol_vexflow_safe(beats, max_beats_per_measure=4.0):
     """
     Convert beats to VexFlow duration symbol with aggressive safety checks.
@@ -929,35 +1315,53 @@ def beats_to_duration_symbol_vexflow_safe(beats, max_beats_per_measure=4.0):
     # Clamp beats to reasonable range
     beats = max(0.125, min(beats, max_beats_per_measure))
     
-    # Safe duration mappings (NO dotted whole notes - VexFlow hates them)
-    SAFE_DURATIONS = {
-        'w': 4.0,     # whole note
-        'h.': 3.0,    # dotted half (safe)
-        'h': 2.0,     # half note
-        'q.': 1.5,    # dotted quarter
-        'q': 1.0,     # quarter note
-        '8.': 0.75,   # dotted eighth
-        '8': 0.5,     # eighth note
-        '16.': 0.375, # dotted sixteenth  
-        '16': 0.25,   # sixteenth note
-        '32': 0.125   # thirty-second note
-    }
-    
     # NEVER allow dotted whole notes or anything >= 6 beats
     if beats >= 6.0:
         return 'w'  # Convert to regular whole note
     
-    # Find closest safe duration
-    closest_duration = 'q'  # Safe default
-    closest_diff = float('inf')
+    # Quantized durations usually match a safe duration exactly
+    symbol = _SAFE_BEATS_TO_SYMBOL.get(beats)
+    if symbol is not None:
+        return symbol
     
-    for symbol, duration_beats in SAFE_DURATIONS.items():
-        diff = abs(beats - duration_beats)
-        if diff < closest_diff:
-            closest_diff = diff
-            closest_duration = symbol
+    # Find closest safe duration: binary search for the first duration
+    # >= beats, then step down if the shorter neighbour is strictly closer
+    i = bisect_left(_SAFE_DURATION_BEATS, beats)
+    if i == len(_SAFE_DURATION_BEATS):
+        return _SAFE_DURATION_SYMBOLS[-1]
+    if i > 0 and beats - _SAFE_DURATION_BEATS[i - 1] < _SAFE_DURATION_BEATS[i] - beats:
+        i -= 1
     
-    return closest_duration
+    return _SAFE_DURATION_SYMBOLS[i]
+
+
+def beats_to_duration_symbol_vexflow_safe_batch(beats, max_beats_per_measure=4.0):
+    """
+    Vectorized beats_to_duration_symbol_vexflow_safe over many durations.
+
+    Args:
+        beats (array-like): Durations in beats
+        max_beats_per_measure (float): Longest duration allowed
+
+    Returns:
+        numpy.ndarray: VexFlow duration symbol for each duration
+    """
+    return _SAFE_DURATION_SYMBOLS_ARRAY[_safe_duration_indices(beats, max_beats_per_measure)]
+
+
+def _safe_duration_indices(beats, max_beats_per_measure):
+    """Index into _SAFE_DURATION_SYMBOLS of the safe symbol for each duration."""
+    beats = np.maximum(np.minimum(np.asarray(beats, dtype=np.float64), max_beats_per_measure), 0.125)
+
+    # Same rule as the scalar version: take the first duration >= beats and
+    # step down where the shorter neighbour is strictly closer (or none is >=)
+    last = len(_SAFE_DURATION_BEATS_ARRAY) - 1
+    idx = np.searchsorted(_SAFE_DURATION_BEATS_ARRAY, beats)
+    upper = _SAFE_DURATION_BEATS_ARRAY[np.minimum(idx, last)]
+    lower = _SAFE_DURATION_BEATS_ARRAY[np.maximum(idx - 1, 0)]
+    step_down = (idx > last) | ((idx > 0) & (beats - lower < upper - beats))
+
+    return idx - step_down
 
 
 def determine_clef_pianotour_safe(midi_note):
@@ -968,16 +1372,19 @@ def determine_clef_pianotour_safe(midi_note):
     return 'treble' if midi_note >= 60 else 'bass'
 
 
-def determine_chord_clef_pianotour_safe(note_group):
+def determine_chord_clef_pianotour_safe(note_group, is_sorted=False):
     """
     Determine clef for a chord group with PianoTour-specific logic.
+    Pass is_sorted=True when note_group is already sorted by pitch.
     """
     if not note_group:
         return 'treble'
     
-    note_group.sort(key=lambda x: x['midi_note'])
-    lowest_note = note_group[0]['midi_note']
-    highest_note = note_group[-1]['midi_note']
+    # A lone note gets its pitch's default clef
+    if len(note_group) == 1:
+        return 'treble' if note_group[0]['midi_note'] >= 60 else 'bass'
+    
+    lowest_note, highest_note = _pitch_range(note_group, is_sorted)
     
     # More conservative clef assignment for PianoTour
     if highest_note < 60:  # All notes below C4 = bass
@@ -992,16 +1399,18 @@ def determine_chord_clef_pianotour_safe(note_group):
             return 'treble'  # Default to treble for PianoTour compatibility
 
 
-def validate_measure_for_vexflow(measure_data, time_signature):
+def validate_measure_for_vexflow(measure_data, time_signature, total_beats=None, max_beats=None):
     """
     Validate that a measure won't cause VexFlow "too many ticks" errors.
+    Pass total_beats when the caller already tracked the measure's running
+    total to skip re-walking its notes, and max_beats (see
+    measure_length_beats) to avoid recomputing it for every measure.
     """
-    max_beats = (time_signature['numerator'] * 4.0) / time_signature['denominator']
+    if max_beats is None:
+        max_beats = measure_length_beats(time_signature['numerator'], time_signature['denominator'])
     
-    total_beats = 0
-    for note in measure_data:
-        duration_beats = DURATION_TO_BEATS.get(note['duration'], 1.0)
-        total_beats += duration_beats
+    if total_beats is None:
+        total_beats = sum(DURATION_TO_BEATS.get(note['duration'], 1.0) for note in measure_data)
     
     is_valid = total_beats <= max_beats + 0.01  # Small tolerance for floating point
     